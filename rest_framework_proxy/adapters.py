@@ -1,6 +1,15 @@
+import io
+import select
 import socket
 
+try:
+    import selectors
+except ImportError:  # Python 2
+    selectors = None
+
+from django.utils.six.moves import http_client
 from requests.adapters import HTTPAdapter
+from requests.packages.urllib3._collections import HTTPHeaderDict
 from requests.packages.urllib3.response import HTTPResponse
 from requests.packages.urllib3.exceptions import MaxRetryError
 from requests.packages.urllib3.exceptions import TimeoutError
@@ -9,7 +18,157 @@ from requests.packages.urllib3.exceptions import HTTPError as _HTTPError
 from requests.exceptions import ConnectionError, Timeout, SSLError
 
 
+class PrefixedSocketReader(io.RawIOBase):
+    """
+    Raw reader returning `prefix` before the rest of the socket data.
+    """
+    def __init__(self, sock, prefix):
+        self.sock = sock
+        self.prefix = prefix
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self.prefix:
+            size = min(len(b), len(self.prefix))
+            b[:size] = self.prefix[:size]
+            self.prefix = self.prefix[size:]
+            return size
+        return self.sock.recv_into(b)
+
+    def close(self):
+        # The connection cannot be reused, close it along with the response
+        if not self.closed:
+            self.sock.close()
+        super(PrefixedSocketReader, self).close()
+
+
+class PrefixedSocket(object):
+    """
+    Socket wrapper used to parse a response whose first bytes have
+    already been read from the socket.
+    """
+    def __init__(self, sock, prefix):
+        self.sock = sock
+        self.prefix = prefix
+
+    def makefile(self, mode='rb', *args, **kwargs):
+        return io.BufferedReader(PrefixedSocketReader(self.sock, self.prefix))
+
+
+def read_line(sock, limit=65536):
+    """
+    Read a single line from socket without reading past it.
+    """
+    line = b''
+    while not line.endswith(b'\n'):
+        data = sock.recv(1)
+        if not data:
+            raise socket.error('Connection closed while waiting for response')
+        line += data
+        if len(line) > limit:
+            raise socket.error('Response line too long')
+    return line
+
+
+def wait_readable(sock, timeout):
+    """
+    Wait until socket is readable. Unlike select.select, works with file
+    descriptors above FD_SETSIZE.
+    """
+    if selectors is None:
+        poller = select.poll()
+        poller.register(sock, select.POLLIN)
+        return bool(poller.poll(None if timeout is None else timeout * 1000))
+
+    selector = selectors.DefaultSelector()
+    try:
+        selector.register(sock, selectors.EVENT_READ)
+        return bool(selector.select(timeout))
+    finally:
+        selector.close()
+
+
+def wait_for_continue(sock, method, timeout):
+    """
+    Wait for the interim response of a request sent with
+    `Expect: 100-continue`.
+
+    Returns None if the body should be sent, either because the server
+    responded with 100 Continue or did not respond within `timeout`.
+    Otherwise returns the final response sent by the server.
+    """
+    pending = getattr(sock, 'pending', None)
+    if not (pending and pending()) and not wait_readable(sock, timeout):
+        return None
+
+    original_timeout = sock.gettimeout()
+    sock.settimeout(timeout)
+    try:
+        status_line = read_line(sock)
+        parts = status_line.split(None, 2)
+        if len(parts) > 1 and parts[1] == b'100':
+            # Skip interim headers
+            while read_line(sock) not in (b'\r\n', b'\n'):
+                pass
+            return None
+    finally:
+        sock.settimeout(original_timeout)
+
+    response = http_client.HTTPResponse(PrefixedSocket(sock, status_line), method=method)
+    response.begin()
+    return response
+
+
+def build_urllib3_response(r, pool=None, connection=None):
+    """
+    Wrap http.client response into urllib3 response. urllib3 2.x no longer
+    provides HTTPResponse.from_httplib.
+    """
+    if hasattr(HTTPResponse, 'from_httplib'):
+        return HTTPResponse.from_httplib(r,
+            pool=pool,
+            connection=connection,
+            preload_content=False,
+            decode_content=False
+        )
+
+    headers = HTTPHeaderDict()
+    for header, value in r.msg.items():
+        headers.add(header, value)
+    return HTTPResponse(
+        body=r,
+        headers=headers,
+        status=r.status,
+        version=r.version,
+        reason=r.reason,
+        preload_content=False,
+        decode_content=False,
+        original_response=r,
+        pool=pool,
+        connection=connection,
+        msg=r.msg
+    )
+
+
 class StreamingHTTPAdapter(HTTPAdapter):
+    def __init__(self, *args, **kwargs):
+        # Bodies of at least this size are sent with Expect: 100-continue
+        self.expect_continue_threshold = kwargs.pop('expect_continue_threshold', None)
+        # Seconds to wait for the interim response before sending the body
+        self.expect_continue_timeout = kwargs.pop('expect_continue_timeout', 1)
+        super(StreamingHTTPAdapter, self).__init__(*args, **kwargs)
+
+    def use_expect_continue(self, request):
+        if self.expect_continue_threshold is None:
+            return False
+        try:
+            content_length = int(request.headers.get('Content-Length'))
+        except (TypeError, ValueError):
+            return False
+        return content_length >= self.expect_continue_threshold
+
     def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
         """Stream PreparedRequest object. Returns Response object."""
 
@@ -25,21 +184,33 @@ class StreamingHTTPAdapter(HTTPAdapter):
             low_conn = conn._get_conn(timeout=timeout)
             low_conn.putrequest(request.method, url, skip_accept_encoding=True)
 
+            expect_continue = self.use_expect_continue(request)
+            if expect_continue:
+                low_conn.putheader('Expect', '100-continue')
+
             for header, value in request.headers.items():
                 low_conn.putheader(header, value)
 
             low_conn.endheaders()
 
-            for i in request.body:
-                low_conn.send(i)
+            r = None
+            if expect_continue:
+                r = wait_for_continue(low_conn.sock, request.method,
+                        self.expect_continue_timeout)
 
-            r = low_conn.getresponse()
-            resp = HTTPResponse.from_httplib(r,
-                pool=conn,
-                connection=low_conn,
-                preload_content=False,
-                decode_content=False
-            )
+            if r is None:
+                for i in request.body:
+                    low_conn.send(i)
+
+                # urllib3 2.x overrides getresponse() for requests sent
+                # through its own request(), use the http.client one
+                r = http_client.HTTPConnection.getresponse(low_conn)
+                resp = build_urllib3_response(r, pool=conn, connection=low_conn)
+            else:
+                # Upstream refused the request before the body was sent.
+                # The connection is in an undefined state and must not be
+                # returned to the pool.
+                resp = build_urllib3_response(r)
 
         except socket.error as sockerr:
             raise ConnectionError(sockerr)
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+import weakref
+
+from django.utils import six
+
+from rest_framework_proxy.utils import normalize_params
+
+
+logger = logging.getLogger(__name__)
+
+# Headers which are never written to the capture file
+REDACTED_HEADERS = ('authorization', 'cookie', 'proxy-authorization')
+
+
+class TrafficRecorder(object):
+    """
+    Appends sampled proxied request/response pairs to a capture file,
+    one JSON object per line.
+
+    Bodies are not stored, only their sizes and, when the body is
+    available as a string, its SHA-1 hash.
+    """
+    def __init__(self, path, sample_rate=1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._file = None
+
+    def should_record(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, request, url, params, headers, data, response, proxy_response, started,
+               response_size=None):
+        """
+        Record proxied request. `response` is the upstream response, or None
+        if the upstream could not be reached. `response_size` is the number of
+        decoded body bytes read, if the body was read.
+        """
+        if not self.should_record():
+            return
+
+        record = {
+            'ts': started,
+            'time': time.time() - started,
+            'method': request.method,
+            'url': url,
+            'params': normalize_params(params),
+            'headers': dict((k, v) for k, v in headers.items()
+                            if k.lower() not in REDACTED_HEADERS),
+            'request_size': self.get_request_size(request, data),
+            'request_hash': self.get_request_hash(data),
+            'request_content_type': headers.get('Content-Type'),
+            'status': proxy_response.status_code,
+            'upstream_status': None,
+            'upstream_time': None,
+            'response_size': None,
+            'response_content_type': None,
+        }
+
+        if response is not None:
+            record.update({
+                'upstream_status': response.status_code,
+                'upstream_time': response.elapsed.total_seconds(),
+                'response_size': (response_size if response_size is not None
+                                  else self.get_response_size(response)),
+                'response_content_type': response.headers.get('content-type'),
+            })
+
+        self.write(record)
+
+    def get_request_size(self, request, data):
+        try:
+            return int(request.META.get('CONTENT_LENGTH'))
+        except (TypeError, ValueError):
+            pass
+        if isinstance(data, six.string_types + (bytes,)):
+            return len(data)
+        return 0
+
+    def get_request_hash(self, data):
+        if not data or not isinstance(data, six.string_types + (bytes,)):
+            return None
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+        return hashlib.sha1(data).hexdigest()
+
+    def get_response_size(self, response):
+        if isinstance(response._content, bytes):
+            return len(response._content)
+        try:
+            return int(response.headers.get('content-length'))
+        except (TypeError, ValueError):
+            return None
+
+    def write(self, record):
+        """
+        Append record to the capture file. Capturing must never fail the
+        proxied request, so records which cannot be written are dropped.
+        """
+        try:
+            line = json.dumps(record, separators=(',', ':'), sort_keys=True)
+            with self._lock:
+                if self._file is None:
+                    self._file = open(self.path, 'a')
+                self._file.write(line + '\n')
+                self._file.flush()
+        except (IOError, OSError, TypeError, ValueError):
+            logger.warning('Could not write capture record to %s', self.path, exc_info=True)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_records(path):
+    """
+    Read records from capture file in the order of their timestamps.
+    """
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    records.sort(key=lambda record: record['ts'])
+    return records
+
+
+_recorders = weakref.WeakKeyDictionary()
+_recorders_lock = threading.Lock()
+
+
+def get_recorder(proxy_settings):
+    """
+    Return process-wide recorder configured from `proxy_settings`.
+    """
+    with _recorders_lock:
+        recorder = _recorders.get(proxy_settings)
+        if recorder is None:
+            recorder = TrafficRecorder(proxy_settings.CAPTURE_FILE,
+                                       sample_rate=proxy_settings.CAPTURE_SAMPLE_RATE)
+            _recorders[proxy_settings] = recorder
+    return recorder
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from rest_framework_proxy.capture import read_records
+from rest_framework_proxy.replay import Replayer
+
+
+class Command(BaseCommand):
+    help = 'Replay captured proxy traffic against a local upstream stub and report latencies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('capture_file',
+                            help='File written by the CAPTURE_FILE setting.')
+        parser.add_argument('--view', default='rest_framework_proxy.views.ProxyView',
+                            help='Dotted path of the proxy view class to replay through.')
+        parser.add_argument('--speed', type=float, default=1.0,
+                            help='Replay rate relative to the captured rate, 0 for as fast as possible.')
+        parser.add_argument('--concurrency', type=int, default=10,
+                            help='Maximum number of concurrent requests.')
+        parser.add_argument('--no-delay', action='store_false', dest='delay',
+                            help='Do not simulate captured upstream latency.')
+
+    def handle(self, *args, **options):
+        records = read_records(options['capture_file'])
+        replayer = Replayer(records, import_string(options['view']),
+                            speed=options['speed'],
+                            concurrency=options['concurrency'],
+                            delay=options['delay'])
+        report = replayer.run()
+
+        self.stdout.write('Requests:   %d (%d errors)' % (report['requests'], report['errors']))
+        self.stdout.write('Duration:   %.3f s' % report['duration'])
+        if report['throughput'] is not None:
+            self.stdout.write('Throughput: %.1f req/s' % report['throughput'])
+        for name in ('mean', 'p50', 'p90', 'p99', 'max'):
+            latency = report['latency'][name]
+            if latency is not None:
+                self.stdout.write('%-11s %.1f ms' % (name + ':', latency * 1000))
+        for status, count in sorted(report['statuses'].items()):
+            self.stdout.write('Status %s:  %d' % (status, count))
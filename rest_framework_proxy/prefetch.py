@@ -0,0 +1,283 @@
+import threading
+import time
+import weakref
+
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+from django.utils import six
+from django.utils.six.moves.urllib.parse import urlsplit
+from requests.exceptions import RequestException
+
+from rest_framework_proxy.utils import normalize_params, split_url
+
+
+# Upstream status codes which are treated as a sign of pressure
+PRESSURE_STATUS_CODES = (429, 502, 503, 504)
+
+
+def same_origin(url, other):
+    """
+    Return True if both URLs have the same scheme and host.
+    """
+    return urlsplit(url)[:2] == urlsplit(other)[:2]
+
+
+def get_next_link(response, data=None):
+    """
+    Return URL of the next page, either from the Link header or from
+    the `next` field of DRF-style paginated body.
+    """
+    link = response.links.get('next', {}).get('url')
+    if link:
+        return link
+
+    if isinstance(data, dict):
+        link = data.get('next')
+        if isinstance(link, six.string_types):
+            return link
+    return None
+
+
+class Prefetcher(object):
+    """
+    Fetches following pages of paginated upstream lists in background and
+    keeps them in a short-lived bounded cache. Pages already cached are
+    followed, so the cache always reaches `depth` pages ahead of the client.
+
+    Prefetching is paused for `cooldown` seconds whenever the hit rate drops
+    below `min_hit_rate` or the upstream shows signs of pressure.
+    """
+    def __init__(self, depth=1, workers=2, cache_size=100, cache_timeout=30,
+                 max_content_size=None, min_hit_rate=0.5, sample_size=20, cooldown=60):
+        self.depth = depth
+        self.workers = workers
+        self.cache_size = cache_size
+        self.cache_timeout = cache_timeout
+        self.max_content_size = max_content_size
+        self.min_hit_rate = min_hit_rate
+        self.sample_size = sample_size
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self._pool = None
+        self._cache = OrderedDict()
+        # Key of each page being fetched mapped to its prefetch depth
+        self._pending = {}
+        self._paused_until = 0
+        self._window_hits = 0
+        self._window_wasted = 0
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'prefetched': 0,
+            'wasted': 0,
+            'errors': 0,
+        }
+
+    def make_key(self, url, params, headers):
+        return (url, normalize_params(params), frozenset((headers or {}).items()))
+
+    def get(self, url, params, headers):
+        """
+        Pop cached response for given request. Returns None on miss.
+        """
+        key = self.make_key(url, params, headers)
+        now = time.time()
+        with self._lock:
+            entry = self._cache.pop(key, None)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+
+            expires, response = entry[:2]
+            if expires < now:
+                self._counters['misses'] += 1
+                self._waste(1)
+                return None
+
+            self._counters['hits'] += 1
+            self._window_hits += 1
+            self._evaluate(now)
+            return response
+
+    def schedule(self, url, headers, fetch, depth=None):
+        """
+        Prefetch `url` and up to `depth` following pages using `fetch`,
+        a callable taking url and params and returning a response. The
+        response should be streamed, so that oversized pages are never
+        read in full.
+        """
+        if depth is None:
+            depth = self.depth
+        if depth < 1:
+            return
+
+        base_url, params = split_url(url)
+        key = self.make_key(base_url, params, headers)
+        now = time.time()
+        with self._lock:
+            if now < self._paused_until:
+                return
+            if key in self._pending:
+                # Following pages are scheduled once the fetch completes
+                self._pending[key] = max(self._pending[key], depth)
+                return
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] < now:
+                # Expired pages are refetched instead of followed
+                del self._cache[key]
+                entry = None
+                self._waste(1)
+                if now < self._paused_until:
+                    return
+            if entry is None:
+                if len(self._pending) >= self.workers * 2:
+                    # Do not queue more work than the pool can keep up with
+                    return
+                self._pending[key] = depth
+                if self._pool is None:
+                    self._pool = ThreadPool(self.workers)
+                pool = self._pool
+
+        if entry is None:
+            pool.apply_async(self._prefetch, (key, url, headers, fetch))
+        else:
+            self._schedule_next(url, entry[2], headers, fetch, depth)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['cached'] = len(self._cache)
+            stats['paused'] = time.time() < self._paused_until
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _prefetch(self, key, url, headers, fetch):
+        base_url, params = key[0], list(key[1])
+        response = content = next_url = None
+        failed = False
+        try:
+            response = fetch(base_url, params)
+            if response.status_code == 200:
+                content = self._read(response)
+            if content is not None and self.depth > 1:
+                try:
+                    next_url = get_next_link(response, response.json())
+                except ValueError:
+                    pass
+        except RequestException:
+            failed = True
+        except Exception:
+            with self._lock:
+                self._pending.pop(key, None)
+            raise
+        finally:
+            # Cached pages keep their content, the connection is always released
+            if response is not None:
+                response.close()
+
+        with self._lock:
+            depth = self._pending.pop(key, 1)
+
+            if failed or response.status_code in PRESSURE_STATUS_CODES:
+                self._counters['errors'] += 1
+                self._pause()
+                return
+            if content is None:
+                return
+
+            self._store(key, response, next_url)
+
+        self._schedule_next(url, next_url, headers, fetch, depth)
+
+    def _read(self, response):
+        """
+        Read response content, or return None if it is larger than
+        `max_content_size`.
+        """
+        limit = self.max_content_size
+        if limit is not None:
+            try:
+                if int(response.headers.get('content-length')) > limit:
+                    response.close()
+                    return None
+            except (TypeError, ValueError):
+                pass
+
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(64 * 1024):
+            size += len(chunk)
+            if limit is not None and size > limit:
+                response.close()
+                return None
+            chunks.append(chunk)
+
+        response._content = b''.join(chunks)
+        return response._content
+
+    def _schedule_next(self, url, next_url, headers, fetch, depth):
+        if depth > 1 and next_url and same_origin(next_url, url):
+            self.schedule(next_url, headers, fetch, depth - 1)
+
+    def _store(self, key, response, next_url):
+        now = time.time()
+        expired = [k for k, entry in self._cache.items() if entry[0] < now]
+        for k in expired:
+            del self._cache[k]
+
+        evicted = 0
+        while len(self._cache) >= self.cache_size:
+            self._cache.popitem(last=False)
+            evicted += 1
+
+        self._cache[key] = (now + self.cache_timeout, response, next_url)
+        self._counters['prefetched'] += 1
+        self._waste(len(expired) + evicted)
+
+    def _waste(self, count):
+        if count:
+            self._counters['wasted'] += count
+            self._window_wasted += count
+            self._evaluate(time.time())
+
+    def _evaluate(self, now):
+        total = self._window_hits + self._window_wasted
+        if total < self.sample_size:
+            return
+        if float(self._window_hits) / total < self.min_hit_rate:
+            self._pause(now)
+        self._window_hits = 0
+        self._window_wasted = 0
+
+    def _pause(self, now=None):
+        self._paused_until = (now or time.time()) + self.cooldown
+
+
+_prefetchers = weakref.WeakKeyDictionary()
+_prefetchers_lock = threading.Lock()
+
+
+def get_prefetcher(proxy_settings):
+    """
+    Return process-wide prefetcher configured from `proxy_settings`.
+    """
+    with _prefetchers_lock:
+        prefetcher = _prefetchers.get(proxy_settings)
+        if prefetcher is None:
+            prefetcher = Prefetcher(
+                depth=proxy_settings.PREFETCH_DEPTH,
+                workers=proxy_settings.PREFETCH_WORKERS,
+                cache_size=proxy_settings.PREFETCH_CACHE_SIZE,
+                cache_timeout=proxy_settings.PREFETCH_CACHE_TIMEOUT,
+                max_content_size=proxy_settings.RESPONSE_MAX_MEMORY_SIZE,
+                min_hit_rate=proxy_settings.PREFETCH_MIN_HIT_RATE,
+                sample_size=proxy_settings.PREFETCH_SAMPLE_SIZE,
+                cooldown=proxy_settings.PREFETCH_COOLDOWN,
+            )
+            _prefetchers[proxy_settings] = prefetcher
+    return prefetcher
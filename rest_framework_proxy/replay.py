@@ -0,0 +1,220 @@
+import json
+import math
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from django.test import RequestFactory
+from django.utils.six.moves import BaseHTTPServer, socketserver
+from django.utils.six.moves.urllib.parse import urlencode, urlsplit
+
+from rest_framework_proxy.utils import normalize_params, split_url
+
+
+def make_body(size, content_type):
+    """
+    Build a body of roughly `size` bytes which can be parsed as
+    `content_type`. Captured bodies are not stored, only their sizes.
+    """
+    size = size or 0
+    if content_type and 'json' in content_type:
+        return json.dumps({'data': 'x' * max(size - 12, 0)})
+    return 'data=' + 'x' * max(size - 5, 0)
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of sorted `values`.
+    """
+    if not values:
+        return None
+    index = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[max(index, 0)]
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class UpstreamStub(object):
+    """
+    Local HTTP server answering captured requests with bodies of the
+    captured size, optionally after the captured upstream latency.
+    """
+    def __init__(self, records, delay=True):
+        self.delay = delay
+        self.routes = {}
+        for record in records:
+            if record.get('upstream_status') is None:
+                continue
+            key = self.make_key(record['method'], urlsplit(record['url']).path, record['params'])
+            self.routes[key] = record
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.get_handler_class())
+        self.thread = None
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % self.server.server_address
+
+    def make_key(self, method, path, params):
+        return (method, path or '/', normalize_params(params))
+
+    def get_handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def handle_request(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+
+                path, params = split_url(self.path)
+                record = stub.routes.get(stub.make_key(self.command, path, params))
+                if record is None:
+                    status, content_type, body = 404, 'text/plain', ''
+                else:
+                    if stub.delay and record.get('upstream_time'):
+                        time.sleep(record['upstream_time'])
+                    status = record['upstream_status']
+                    content_type = record.get('response_content_type') or 'application/octet-stream'
+                    body = make_body(record.get('response_size'), content_type)
+
+                body = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_request
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class Replayer(object):
+    """
+    Replays captured records through `view_class` against an upstream stub.
+
+    Requests are issued at the captured rate multiplied by `speed`, or as
+    fast as `concurrency` allows if `speed` is 0.
+    """
+    def __init__(self, records, view_class, speed=1.0, concurrency=10, delay=True):
+        self.records = records
+        self.view_class = view_class
+        self.speed = speed
+        self.concurrency = concurrency
+        self.delay = delay
+        self.factory = RequestFactory()
+
+        # Replayed traffic must not end up in the capture file
+        self.replay_view_class = type('Replay%s' % view_class.__name__, (view_class,), {
+            'get_recorder': lambda self, request: None,
+        })
+
+    def get_view(self, stub, record):
+        source = urlsplit(record['url']).path.lstrip('/').replace('%', '%%')
+        return self.replay_view_class.as_view(proxy_host=stub.url, source=source)
+
+    def get_request(self, record):
+        path = '/' + urlsplit(record['url']).path.lstrip('/')
+        if record['params']:
+            path += '?' + urlencode(normalize_params(record['params']))
+
+        content_type = record.get('request_content_type') or 'application/x-www-form-urlencoded'
+        if 'multipart' in content_type:
+            # File uploads are replayed as form data of the same size
+            content_type = 'application/x-www-form-urlencoded'
+
+        data = ''
+        if record['method'] not in ('GET', 'DELETE'):
+            data = make_body(record.get('request_size'), content_type)
+        request = self.factory.generic(record['method'], path, data, content_type=content_type)
+        for header, value in record.get('headers', {}).items():
+            if header.lower() not in ('content-type', 'content-length'):
+                request.META['HTTP_' + header.upper().replace('-', '_')] = value
+        return request
+
+    def send(self, stub, record):
+        view = self.get_view(stub, record)
+        request = self.get_request(record)
+        started = time.time()
+        response = view(request)
+        if response.streaming:
+            for chunk in response.streaming_content:
+                pass
+        elif hasattr(response, 'render'):
+            response.render()
+        response.close()
+        return time.time() - started, response.status_code
+
+    def run(self):
+        if not self.records:
+            return self.get_report([], 0)
+
+        pool = ThreadPool(self.concurrency)
+        with UpstreamStub(self.records, delay=self.delay) as stub:
+            first = self.records[0]['ts']
+            started = time.time()
+            results = []
+            for record in self.records:
+                if self.speed:
+                    wait = (record['ts'] - first) / self.speed - (time.time() - started)
+                    if wait > 0:
+                        time.sleep(wait)
+                results.append(pool.apply_async(self.send, (stub, record)))
+
+            samples = []
+            for result in results:
+                try:
+                    samples.append(result.get())
+                except Exception:
+                    samples.append((None, None))
+            duration = time.time() - started
+        pool.close()
+        pool.join()
+        return self.get_report(samples, duration)
+
+    def get_report(self, samples, duration):
+        latencies = sorted(latency for latency, status in samples if latency is not None)
+        statuses = {}
+        for latency, status in samples:
+            if status is not None:
+                statuses[status] = statuses.get(status, 0) + 1
+
+        return {
+            'requests': len(samples),
+            'errors': len(samples) - len(latencies),
+            'duration': duration,
+            'throughput': len(latencies) / duration if duration else None,
+            'latency': {
+                'mean': sum(latencies) / len(latencies) if latencies else None,
+                'p50': percentile(latencies, 50),
+                'p90': percentile(latencies, 90),
+                'p99': percentile(latencies, 99),
+                'max': latencies[-1] if latencies else None,
+            },
+            'statuses': statuses,
+        }
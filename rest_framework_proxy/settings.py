@@ -30,6 +30,36 @@ DEFAULTS = {
 
     # Perform a SSL Cert Verification on URI requests are being proxied to
     'VERIFY_SSL': True,
+
+    # Response bodies larger than this (in bytes) are spooled to disk
+    'RESPONSE_MAX_MEMORY_SIZE': 1024 * 1024,
+
+    # Chunk size used when spooling or relaying response bodies
+    'RESPONSE_CHUNK_SIZE': 64 * 1024,
+
+    # Send streamed uploads of at least this size (in bytes) with
+    # Expect: 100-continue and wait EXPECT_CONTINUE_TIMEOUT seconds for
+    # the upstream to accept the request before sending the body
+    'EXPECT_CONTINUE_THRESHOLD': 1024 * 1024,
+    'EXPECT_CONTINUE_TIMEOUT': 1,
+
+    # Prefetch following pages of paginated list responses in background
+    'PREFETCH': False,
+    'PREFETCH_DEPTH': 1,
+    'PREFETCH_WORKERS': 2,
+    'PREFETCH_CACHE_SIZE': 100,
+    'PREFETCH_CACHE_TIMEOUT': 30,
+
+    # Pause prefetching for PREFETCH_COOLDOWN seconds if less than
+    # PREFETCH_MIN_HIT_RATE of the last PREFETCH_SAMPLE_SIZE prefetched
+    # pages were used, or if the upstream is under pressure
+    'PREFETCH_MIN_HIT_RATE': 0.5,
+    'PREFETCH_SAMPLE_SIZE': 20,
+    'PREFETCH_COOLDOWN': 60,
+
+    # Append sampled request/response pairs to this file for replaying
+    'CAPTURE_FILE': None,
+    'CAPTURE_SAMPLE_RATE': 1.0,
 }
 
 api_proxy_settings = APISettings(USER_SETTINGS, DEFAULTS)
@@ -1,11 +1,41 @@
 import mimetypes
+import mmap
 
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from django.utils import six
+from django.utils.six.moves.urllib.parse import parse_qsl, urlsplit, urlunsplit
 from requests.packages.urllib3.filepost import choose_boundary
 
 
 def generate_boundary():
     return choose_boundary()
 
+
+def normalize_params(params):
+    """
+    Turn any params value accepted by requests into a hashable, ordered tuple.
+    """
+    if not params:
+        return ()
+    items = params.items() if hasattr(params, 'items') else params
+    normalized = []
+    for key, values in items:
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        for value in values:
+            normalized.append((six.text_type(key), six.text_type(value)))
+    return tuple(sorted(normalized))
+
+
+def split_url(url):
+    """
+    Split URL into base URL and query parameters.
+    """
+    scheme, netloc, path, query, fragment = urlsplit(url)
+    return urlunsplit((scheme, netloc, path, '', '')), parse_qsl(query, keep_blank_values=True)
+
+
 class StreamingMultipart(object):
     def __init__(self, data, files, boundary, chunk_size = 1024):
         self.data = data
@@ -62,3 +92,85 @@ class StreamingMultipart(object):
 
     def build_multipart_footer(self):
         return '--%s--\r\n' % self.boundary
+
+
+class ResponseBuffer(object):
+    """
+    Size-aware buffer for upstream response bodies.
+
+    Bodies up to ``max_memory_size`` bytes are kept in memory. Larger bodies
+    are spooled to a temporary file and read back through a memory map so
+    they never have to be held in RAM as a whole.
+    """
+    def __init__(self, response, max_memory_size, chunk_size=64 * 1024):
+        self.chunk_size = chunk_size
+        self._file = None
+        self._mmap = None
+
+        if response._content_consumed or self.fits_in_memory(response, max_memory_size):
+            # BytesIO shares the buffer of the bytes object until written to
+            self.stream = BytesIO(response.content)
+            self.size = len(response.content)
+            return
+
+        # Rollover is handled here so that a threshold of 0 always spools,
+        # SpooledTemporaryFile would never roll over with max_size=0.
+        self._file = SpooledTemporaryFile(max_size=0)
+        size = 0
+        rolled = False
+        try:
+            for chunk in response.iter_content(chunk_size):
+                self._file.write(chunk)
+                size += len(chunk)
+                if not rolled and size > max_memory_size:
+                    self._file.rollover()
+                    rolled = True
+        except Exception:
+            self._file.close()
+            raise
+        finally:
+            response.close()
+
+        # Number of decoded body bytes read from the upstream
+        self.size = size
+
+        if rolled:
+            self._file.flush()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.stream = self._mmap
+        else:
+            self._file.seek(0)
+            self.stream = self._file
+
+    def fits_in_memory(self, response, max_memory_size):
+        # Content-Length is only trustworthy when the body is not encoded,
+        # otherwise the decompressed body may be considerably larger.
+        if response.headers.get('content-encoding'):
+            return False
+        try:
+            content_length = int(response.headers.get('content-length'))
+        except (TypeError, ValueError):
+            return False
+        return content_length <= max_memory_size
+
+    @property
+    def in_memory(self):
+        return self._mmap is None
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+    def __iter__(self):
+        while True:
+            data = self.stream.read(self.chunk_size)
+            if not data:
+                break
+            yield data
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        if self._file is not None:
+            self._file.close()
+        else:
+            self.stream.close()
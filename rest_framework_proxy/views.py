@@ -1,12 +1,13 @@
 import base64
 import json
+import time
 import requests
 
 from django.utils import six
-from django.utils.six import BytesIO as StringIO
-from requests.exceptions import ConnectionError, SSLError, Timeout
+from requests.exceptions import (ChunkedEncodingError, ConnectionError,
+        ContentDecodingError, SSLError, Timeout)
 from requests import sessions
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.utils.mediatypes import media_type_matches
@@ -14,7 +15,9 @@ from rest_framework.exceptions import UnsupportedMediaType
 
 from rest_framework_proxy.settings import api_proxy_settings
 from rest_framework_proxy.adapters import StreamingHTTPAdapter
-from rest_framework_proxy.utils import StreamingMultipart, generate_boundary
+from rest_framework_proxy.capture import get_recorder
+from rest_framework_proxy.prefetch import get_next_link, get_prefetcher, same_origin
+from rest_framework_proxy.utils import ResponseBuffer, StreamingMultipart, generate_boundary
 
 
 class BaseProxyView(APIView):
@@ -23,6 +26,7 @@ class BaseProxyView(APIView):
     source = None
     return_raw = False
     verify_ssl = None
+    prefetch = None
 
 
 class ProxyView(BaseProxyView):
@@ -102,15 +106,50 @@ class ProxyView(BaseProxyView):
     def get_cookies(self, requests):
         return None
 
+    def get_prefetcher(self, request):
+        if request.method != 'GET':
+            return None
+        if self.prefetch or self.proxy_settings.PREFETCH:
+            return get_prefetcher(self.proxy_settings)
+        return None
+
+    def prefetch_next_page(self, prefetcher, response, proxy_response, headers, verify_ssl):
+        next_url = get_next_link(response, getattr(proxy_response, 'data', None))
+        # Never send upstream credentials to a host named by the upstream
+        if not next_url or not same_origin(next_url, self.get_proxy_host()):
+            return
+
+        def fetch(url, params):
+            return requests.request('GET', url,
+                    params=params,
+                    headers=headers,
+                    timeout=self.proxy_settings.TIMEOUT,
+                    verify=verify_ssl,
+                    stream=True)
+
+        prefetcher.schedule(next_url, headers, fetch)
+
+    def get_recorder(self, request):
+        if self.proxy_settings.CAPTURE_FILE:
+            return get_recorder(self.proxy_settings)
+        return None
+
+    def get_response_buffer(self, response):
+        buffer = ResponseBuffer(response,
+                max_memory_size=self.proxy_settings.RESPONSE_MAX_MEMORY_SIZE,
+                chunk_size=self.proxy_settings.RESPONSE_CHUNK_SIZE)
+        self.response_size = buffer.size
+        return buffer
+
     def parse_proxy_response(self, response):
         """
         Modified version of rest_framework.request.Request._parse(self)
         """
         parsers = self.get_parsers()
-        stream = StringIO(response._content)
         content_type = response.headers.get('content-type', None)
 
-        if stream is None or content_type is None:
+        if content_type is None:
+            response.close()
             return {}
 
         parser = None
@@ -119,9 +158,14 @@ class ProxyView(BaseProxyView):
                 parser = item
 
         if not parser:
+            response.close()
             raise UnsupportedMediaType(content_type)
 
-        parsed = parser.parse(stream, content_type)
+        stream = self.get_response_buffer(response)
+        try:
+            parsed = parser.parse(stream, content_type)
+        finally:
+            stream.close()
 
         # Parser classes may return the raw data, or a
         # DataAndFiles object. Return only data.
@@ -132,11 +176,21 @@ class ProxyView(BaseProxyView):
 
     def create_response(self, response):
         if self.return_raw or self.proxy_settings.RETURN_RAW:
-            return HttpResponse(response.text, status=response.status_code,
-                    content_type=response.headers.get('content-type'))
+            stream = self.get_response_buffer(response)
+            content_type = response.headers.get('content-type')
+            if stream.in_memory:
+                content = stream.read()
+                stream.close()
+                return HttpResponse(content, status=response.status_code,
+                        content_type=content_type)
+            # Relay spooled bodies chunk by chunk, the buffer is closed
+            # along with the response.
+            return StreamingHttpResponse(stream, status=response.status_code,
+                    content_type=content_type)
 
         status = response.status_code
         if status >= 400:
+            response.close()
             body = {
                 'code': status,
                 'error': response.reason,
@@ -149,6 +203,8 @@ class ProxyView(BaseProxyView):
         return Response(body, status)
 
     def proxy(self, request, *args, **kwargs):
+        started = time.time()
+        self.response_size = None
         url = self.get_request_url(request)
         params = self.get_request_params(request)
         data = self.get_request_data(request)
@@ -156,7 +212,18 @@ class ProxyView(BaseProxyView):
         headers = self.get_headers(request)
         verify_ssl = self.get_verify_ssl(request)
         cookies = self.get_cookies(request)
-
+        prefetcher = None
+        if not cookies:
+            # Prefetched pages are shared between clients, so requests with
+            # per-request cookies are never prefetched
+            prefetcher = self.get_prefetcher(request)
+        recorder = self.get_recorder(request)
+
+        if not hasattr(params, 'items'):
+            # Params are used by requests, the prefetch cache and the recorder
+            params = list(params)
+
+        response = None
         try:
             if files:
                 """
@@ -172,9 +239,13 @@ class ProxyView(BaseProxyView):
 
                 body = StreamingMultipart(data, files, boundary)
 
+                adapter = StreamingHTTPAdapter(
+                        expect_continue_threshold=self.proxy_settings.EXPECT_CONTINUE_THRESHOLD,
+                        expect_continue_timeout=self.proxy_settings.EXPECT_CONTINUE_TIMEOUT)
+
                 session = sessions.Session()
-                session.mount('http://', StreamingHTTPAdapter())
-                session.mount('https://', StreamingHTTPAdapter())
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
 
                 response = session.request(request.method, url,
                         params=params,
@@ -182,30 +253,50 @@ class ProxyView(BaseProxyView):
                         headers=headers,
                         timeout=self.proxy_settings.TIMEOUT,
                         verify=verify_ssl,
-                        cookies=cookies)
+                        cookies=cookies,
+                        stream=True)
             else:
-                response = requests.request(request.method, url,
-                        params=params,
-                        data=data,
-                        files=files,
-                        headers=headers,
-                        timeout=self.proxy_settings.TIMEOUT,
-                        verify=verify_ssl,
-                        cookies=cookies)
-        except (ConnectionError, SSLError):
+                if prefetcher:
+                    response = prefetcher.get(url, params, headers)
+
+                if response is None:
+                    response = requests.request(request.method, url,
+                            params=params,
+                            data=data,
+                            files=files,
+                            headers=headers,
+                            timeout=self.proxy_settings.TIMEOUT,
+                            verify=verify_ssl,
+                            cookies=cookies,
+                            stream=True)
+
+            # Response bodies are streamed, so reading them may fail as well
+            proxy_response = self.create_response(response)
+        except (ConnectionError, SSLError, ChunkedEncodingError, ContentDecodingError):
+            if response is not None:
+                response.close()
             status = requests.status_codes.codes.bad_gateway
-            return self.create_error_response({
+            proxy_response = self.create_error_response({
                 'code': status,
                 'error': 'Bad gateway',
             }, status)
         except (Timeout):
+            if response is not None:
+                response.close()
             status = requests.status_codes.codes.gateway_timeout
-            return self.create_error_response({
+            proxy_response = self.create_error_response({
                 'code': status,
                 'error': 'Gateway timed out',
             }, status)
-
-        return self.create_response(response)
+        else:
+            if prefetcher and response.status_code == 200:
+                self.prefetch_next_page(prefetcher, response, proxy_response,
+                        headers, verify_ssl)
+
+        if recorder:
+            recorder.record(request, url, params, headers, data, response,
+                    proxy_response, started, response_size=self.response_size)
+        return proxy_response
 
     def get(self, request, *args, **kwargs):
         return self.proxy(request, *args, **kwargs)
@@ -0,0 +1,155 @@
+import socket
+import threading
+
+from io import BytesIO
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.http.request import QueryDict
+from django.test import TestCase
+from mock import patch
+from requests import Request
+
+from rest_framework.test import APIRequestFactory
+from rest_framework_proxy.adapters import StreamingHTTPAdapter, wait_for_continue
+from tests.helpers import get_view
+
+
+class UploadServer(object):
+    """
+    Single request HTTP server which either refuses uploads before the
+    body is sent or accepts them with 100 Continue.
+    """
+    def __init__(self, accept):
+        self.accept = accept
+        self.headers = b''
+        self.body = b''
+        self.closed_by_client = False
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(1)
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self.listener.getsockname()[1]
+
+    def serve(self):
+        conn, _ = self.listener.accept()
+        conn.settimeout(2)
+        try:
+            data = b''
+            while b'\r\n\r\n' not in data:
+                data += conn.recv(4096)
+            self.headers, self.body = data.split(b'\r\n\r\n', 1)
+
+            if self.accept:
+                length = int([line.split(b':')[1] for line in self.headers.split(b'\r\n')
+                              if line.lower().startswith(b'content-length')][0])
+                conn.sendall(b'HTTP/1.1 100 Continue\r\n\r\n')
+                while len(self.body) < length:
+                    self.body += conn.recv(4096)
+                conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: 2\r\nConnection: close\r\n\r\n{}')
+            else:
+                conn.sendall(b'HTTP/1.1 413 Request Entity Too Large\r\n'
+                             b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+                # Collect anything the client sends until it closes the socket
+                while True:
+                    data = conn.recv(4096)
+                    if not data:
+                        self.closed_by_client = True
+                        break
+                    self.body += data
+        except socket.timeout:
+            pass
+        finally:
+            conn.close()
+            self.listener.close()
+
+
+class WaitForContinueTests(TestCase):
+
+    def setUp(self):
+        self.client, self.server = socket.socketpair()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    def test_continue(self):
+        self.server.sendall(b'HTTP/1.1 100 Continue\r\n\r\nHTTP/1.1 200 OK\r\n')
+
+        self.assertIsNone(wait_for_continue(self.client, 'POST', 1))
+        # Final response is left for the regular response handling
+        self.assertEqual(self.client.recv(64), b'HTTP/1.1 200 OK\r\n')
+
+    def test_does_not_use_select(self):
+        # select.select fails for file descriptors above FD_SETSIZE
+        self.server.sendall(b'HTTP/1.1 100 Continue\r\n\r\n')
+        with patch('rest_framework_proxy.adapters.select.select', side_effect=ValueError):
+            self.assertIsNone(wait_for_continue(self.client, 'POST', 1))
+
+    def test_no_interim_response(self):
+        self.assertIsNone(wait_for_continue(self.client, 'POST', 0.01))
+
+    def test_refused(self):
+        self.server.sendall(b'HTTP/1.1 413 Request Entity Too Large\r\n'
+                            b'Content-Length: 8\r\n\r\ntoo big!')
+
+        response = wait_for_continue(self.client, 'POST', 1)
+        self.assertEqual(response.status, 413)
+        self.assertEqual(response.read(), b'too big!')
+
+
+class StreamingHTTPAdapterTests(TestCase):
+
+    def get_request(self, size):
+        return Request('POST', 'http://example.com/', data=b'x' * size).prepare()
+
+    def test_use_expect_continue(self):
+        adapter = StreamingHTTPAdapter(expect_continue_threshold=100)
+        self.assertFalse(adapter.use_expect_continue(self.get_request(99)))
+        self.assertTrue(adapter.use_expect_continue(self.get_request(100)))
+
+    def test_expect_continue_disabled(self):
+        adapter = StreamingHTTPAdapter()
+        self.assertFalse(adapter.use_expect_continue(self.get_request(10 ** 6)))
+
+
+class ProxyViewExpectContinueTests(TestCase):
+
+    def proxy_upload(self, server):
+        view = get_view({'HOST': server.url, 'EXPECT_CONTINUE_THRESHOLD': 1})
+
+        request = APIRequestFactory().post('some/url')
+        request.content_type = 'multipart/form-data; boundary=x'
+        request.query_params = ''
+
+        upload_bstr = b'x' * 4096
+        upload_data = InMemoryUploadedFile(BytesIO(upload_bstr), 'file', 'test_file.dat',
+                                           'application/octet-stream', len(upload_bstr),
+                                           None, content_type_extra={})
+        request.data = QueryDict(mutable=True)
+        view.get_request_files = lambda r: {'file': upload_data}
+
+        response = view.proxy(request)
+        server.thread.join(5)
+        return response
+
+    def test_refused_upload_body_is_not_sent(self):
+        server = UploadServer(accept=False)
+        response = self.proxy_upload(server)
+
+        self.assertIn(b'Expect: 100-continue', server.headers)
+        self.assertEqual(server.body, b'')
+        self.assertTrue(server.closed_by_client)
+        self.assertEqual(response.status_code, 413)
+
+    def test_accepted_upload_body_is_sent(self):
+        server = UploadServer(accept=True)
+        response = self.proxy_upload(server)
+
+        self.assertIn(b'Expect: 100-continue', server.headers)
+        self.assertIn(b'x' * 4096, server.body)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import tempfile
+import requests
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+from mock import patch
+
+from rest_framework.test import APIRequestFactory
+from rest_framework_proxy.capture import TrafficRecorder, read_records
+from rest_framework_proxy.replay import Replayer, percentile
+from rest_framework_proxy.views import ProxyView
+from tests.helpers import get_view, initialize_request, make_response
+
+
+class CaptureTests(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'capture.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def get_view(self, custom_settings=None):
+        return get_view(dict({'HOST': 'http://api', 'CAPTURE_FILE': self.path},
+                             **(custom_settings or {})), source='items/')
+
+    def proxy(self, view, path='/items/', data=None):
+        request = initialize_request(view, APIRequestFactory().get(path, data))
+        with patch('rest_framework_proxy.views.requests.request') as patched_requests:
+            patched_requests.return_value = make_response(data={'results': [1, 2]})
+            return view.proxy(request)
+
+    def test_records_proxied_request(self):
+        view = self.get_view({'AUTH': {'token': 'secret'}})
+        self.proxy(view, data={'page': 2, 'format': 'json'})
+
+        records = read_records(self.path)
+        self.assertEqual(len(records), 1)
+
+        record = records[0]
+        self.assertEqual(record['method'], 'GET')
+        self.assertEqual(record['url'], 'http://api/items/')
+        self.assertEqual(record['params'], [['page', '2']])
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['upstream_status'], 200)
+        self.assertEqual(record['response_size'], len(b'{"results": [1, 2]}'))
+        self.assertNotIn('Authorization', record['headers'])
+
+    def test_records_size_of_spooled_body(self):
+        view = self.get_view({'RESPONSE_MAX_MEMORY_SIZE': 16})
+        request = initialize_request(view, APIRequestFactory().get('/items/'))
+        body = b'{"data": "' + b'x' * 5000 + b'"}'
+        with patch('rest_framework_proxy.views.requests.request') as patched_requests:
+            patched_requests.return_value = make_response(body=body)
+            view.proxy(request)
+
+        self.assertEqual(read_records(self.path)[0]['response_size'], len(body))
+
+    def test_records_unreachable_upstream(self):
+        view = self.get_view()
+        request = initialize_request(view, APIRequestFactory().get('/items/'))
+        with patch('rest_framework_proxy.views.requests.request') as patched_requests:
+            patched_requests.side_effect = requests.exceptions.ConnectionError()
+            view.proxy(request)
+
+        record = read_records(self.path)[0]
+        self.assertEqual(record['status'], 502)
+        self.assertIsNone(record['upstream_status'])
+
+    def test_unwritable_capture_file_does_not_fail_request(self):
+        view = self.get_view({'CAPTURE_FILE': os.path.join(self.tmpdir, 'missing', 'capture.jsonl')})
+        with patch('rest_framework_proxy.capture.logger') as logger:
+            response = self.proxy(view)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(logger.warning.called)
+
+    def test_unserializable_record_is_dropped(self):
+        recorder = TrafficRecorder(self.path)
+        with patch('rest_framework_proxy.capture.logger'):
+            recorder.write({'ts': object()})
+        recorder.write({'ts': 1})
+        recorder.close()
+        self.assertEqual(read_records(self.path), [{'ts': 1}])
+
+    def test_sample_rate(self):
+        recorder = TrafficRecorder(self.path, sample_rate=0)
+        self.assertFalse(recorder.should_record())
+
+        view = self.get_view({'CAPTURE_SAMPLE_RATE': 0})
+        self.proxy(view)
+        self.assertFalse(os.path.exists(self.path))
+
+
+class ReplayTests(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'capture.jsonl')
+
+        records = [
+            {'ts': 100.0, 'time': 0.01, 'method': 'GET', 'url': 'http://api/items/',
+             'params': [['page', '2']], 'headers': {'Accept': 'application/json'},
+             'request_size': 0, 'request_hash': None, 'request_content_type': 'text/plain',
+             'status': 200, 'upstream_status': 200, 'upstream_time': 0.01,
+             'response_size': 100, 'response_content_type': 'application/json'},
+            {'ts': 100.5, 'time': 0.01, 'method': 'POST', 'url': 'http://api/items/',
+             'params': [], 'headers': {'Accept': 'application/json'},
+             'request_size': 50, 'request_hash': None, 'request_content_type': 'application/json',
+             'status': 400, 'upstream_status': 400, 'upstream_time': 0.01,
+             'response_size': 10, 'response_content_type': 'application/json'},
+        ]
+        with open(self.path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_replay(self):
+        report = Replayer(read_records(self.path), ProxyView, speed=0, delay=False).run()
+
+        self.assertEqual(report['requests'], 2)
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(report['statuses'], {200: 1, 400: 1})
+        self.assertIsNotNone(report['latency']['p99'])
+
+    def test_replay_command(self):
+        out = StringIO()
+        call_command('proxy_replay', self.path, '--speed', '0', '--no-delay', stdout=out)
+        self.assertIn('Requests:   2 (0 errors)', out.getvalue())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertIsNone(percentile([], 50))
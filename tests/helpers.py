@@ -0,0 +1,42 @@
+import json
+import requests
+
+from io import BytesIO
+
+from rest_framework_proxy import settings
+from rest_framework_proxy.views import ProxyView
+
+
+def make_response(status=200, data=None, body=None, headers=None,
+                  content_type='application/json'):
+    """
+    Build upstream response. JSON `data` is loaded as already read
+    content, raw `body` is left to be streamed.
+    """
+    response = requests.Response()
+    response.status_code = status
+    if body is None:
+        response._content = json.dumps(data or {}).encode('utf-8')
+        response._content_consumed = True
+    else:
+        response.raw = BytesIO(body)
+    if content_type:
+        response.headers['Content-Type'] = content_type
+    response.headers.update(headers or {})
+    return response
+
+
+def get_view(custom_settings=None, source=None):
+    view = ProxyView()
+    view.proxy_settings = settings.APISettings(
+        custom_settings, settings.DEFAULTS)
+    view.source = source
+    view.kwargs = {}
+    view.format_kwarg = None
+    return view
+
+
+def initialize_request(view, request):
+    request = view.initialize_request(request)
+    view.request = request
+    return request
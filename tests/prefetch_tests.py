@@ -0,0 +1,177 @@
+import time
+
+from django.test import TestCase
+from mock import Mock, patch
+
+from rest_framework.test import APIRequestFactory
+from rest_framework_proxy.prefetch import Prefetcher, get_prefetcher
+from tests.helpers import get_view, initialize_request, make_response
+
+
+def wait(prefetcher, condition=None, timeout=2):
+    condition = condition or (lambda: not prefetcher._pending)
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class PrefetcherTests(TestCase):
+
+    def test_prefetched_page_is_served_once(self):
+        prefetcher = Prefetcher()
+        fetch = Mock(return_value=make_response())
+        headers = {'Accept': 'application/json'}
+
+        prefetcher.schedule('http://api/items/?page=2', headers, fetch)
+        wait(prefetcher)
+
+        fetch.assert_called_once_with('http://api/items/', [('page', '2')])
+        self.assertIsNotNone(prefetcher.get('http://api/items/', [('page', ['2'])], headers))
+        self.assertIsNone(prefetcher.get('http://api/items/', [('page', ['2'])], headers))
+
+        stats = prefetcher.stats()
+        self.assertEqual(stats['prefetched'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_headers_are_part_of_key(self):
+        prefetcher = Prefetcher()
+        fetch = Mock(return_value=make_response())
+
+        prefetcher.schedule('http://api/items/?page=2', {'Authorization': 'a'}, fetch)
+        wait(prefetcher)
+
+        self.assertIsNone(prefetcher.get('http://api/items/', [('page', ['2'])], {'Authorization': 'b'}))
+
+    def test_follows_next_links_up_to_depth(self):
+        prefetcher = Prefetcher(depth=2)
+        pages = {
+            '2': make_response(data={'next': 'http://api/items/?page=3'}),
+            '3': make_response(data={'next': 'http://api/items/?page=4'}),
+        }
+        fetch = Mock(side_effect=lambda url, params: pages[params[0][1]])
+
+        prefetcher.schedule('http://api/items/?page=2', {}, fetch)
+        wait(prefetcher, lambda: prefetcher.stats()['cached'] == 2)
+
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(prefetcher.stats()['cached'], 2)
+
+    def test_depth_is_a_sliding_window(self):
+        prefetcher = Prefetcher(depth=2)
+        pages = dict((str(page), make_response(data={'next': 'http://api/items/?page=%d' % (page + 1)}))
+                     for page in range(2, 5))
+        fetch = Mock(side_effect=lambda url, params: pages[params[0][1]])
+
+        prefetcher.schedule('http://api/items/?page=2', {}, fetch)
+        wait(prefetcher, lambda: prefetcher.stats()['cached'] == 2)
+
+        # Serving page 2 schedules page 3, which is cached, so page 4 is fetched
+        self.assertIsNotNone(prefetcher.get('http://api/items/', [('page', '2')], {}))
+        prefetcher.schedule('http://api/items/?page=3', {}, fetch)
+        wait(prefetcher, lambda: prefetcher.stats()['cached'] == 2 and fetch.call_count == 3)
+
+        self.assertEqual(fetch.call_args[0], ('http://api/items/', [('page', '4')]))
+        self.assertIsNotNone(prefetcher.get('http://api/items/', [('page', '4')], {}))
+
+    def test_oversized_page_is_not_cached(self):
+        prefetcher = Prefetcher(max_content_size=8)
+        response = make_response(data={'results': 'x' * 64})
+        fetch = Mock(return_value=response)
+
+        prefetcher.schedule('http://api/items/?page=2', {}, fetch)
+        wait(prefetcher)
+        self.assertEqual(prefetcher.stats()['cached'], 0)
+
+        response.headers['Content-Length'] = '1000'
+        response.iter_content = Mock()
+        prefetcher.schedule('http://api/items/?page=3', {}, fetch)
+        wait(prefetcher)
+        self.assertEqual(prefetcher.stats()['cached'], 0)
+        self.assertFalse(response.iter_content.called)
+
+    def test_expired_page_is_refetched(self):
+        prefetcher = Prefetcher(cache_timeout=-1)
+        fetch = Mock(return_value=make_response())
+
+        prefetcher.schedule('http://api/items/?page=2', {}, fetch)
+        wait(prefetcher)
+        prefetcher.schedule('http://api/items/?page=2', {}, fetch)
+        wait(prefetcher)
+
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(prefetcher.stats()['wasted'], 1)
+
+    def test_upstream_pressure_pauses_prefetching(self):
+        prefetcher = Prefetcher()
+        response = make_response(status=503)
+        response.close = Mock()
+        fetch = Mock(return_value=response)
+
+        prefetcher.schedule('http://api/items/?page=2', {}, fetch)
+        wait(prefetcher)
+        self.assertTrue(prefetcher.stats()['paused'])
+        self.assertTrue(response.close.called)
+
+        prefetcher.schedule('http://api/items/?page=3', {}, fetch)
+        self.assertFalse(prefetcher._pending)
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_low_hit_rate_pauses_prefetching(self):
+        prefetcher = Prefetcher(cache_size=1, sample_size=2)
+        fetch = Mock(return_value=make_response())
+
+        for page in range(2, 5):
+            prefetcher.schedule('http://api/items/?page=%d' % page, {}, fetch)
+            wait(prefetcher)
+
+        stats = prefetcher.stats()
+        self.assertEqual(stats['wasted'], 2)
+        self.assertTrue(stats['paused'])
+
+
+class ProxyViewPrefetchTests(TestCase):
+
+    def get_view(self):
+        return get_view({'HOST': 'http://api', 'PREFETCH': True}, source='items/')
+
+    def proxy_first_page(self, view, next_url):
+        request = initialize_request(view, APIRequestFactory().get('/items/'))
+        with patch('rest_framework_proxy.views.requests.request') as patched_requests:
+            patched_requests.return_value = make_response(data={'next': next_url})
+            view.proxy(request)
+            wait(get_prefetcher(view.proxy_settings))
+            return patched_requests.call_count
+
+    def test_next_link_to_other_host_is_not_prefetched(self):
+        view = self.get_view()
+        self.assertEqual(self.proxy_first_page(view, 'http://api.evil.example/steal'), 1)
+        self.assertEqual(get_prefetcher(view.proxy_settings).stats()['prefetched'], 0)
+
+    def test_requests_with_cookies_are_not_prefetched(self):
+        view = self.get_view()
+        view.get_cookies = lambda r: {'sessionid': 'abc'}
+        self.assertEqual(self.proxy_first_page(view, 'http://api/items/?page=2'), 1)
+        self.assertEqual(get_prefetcher(view.proxy_settings).stats()['prefetched'], 0)
+
+    def test_next_page_is_served_from_prefetch_cache(self):
+        view = self.get_view()
+
+        page1 = make_response(data={'next': 'http://api/items/?page=2', 'results': [1]})
+        page2 = make_response(data={'next': None, 'results': [2]})
+        factory = APIRequestFactory()
+
+        with patch('rest_framework_proxy.views.requests.request') as patched_requests:
+            patched_requests.side_effect = [page1, page2]
+
+            request = initialize_request(view, factory.get('/items/'))
+            response = view.proxy(request)
+            self.assertEqual(response.data['results'], [1])
+            wait(get_prefetcher(view.proxy_settings))
+
+            request = initialize_request(view, factory.get('/items/', {'page': 2}))
+            response = view.proxy(request)
+            self.assertEqual(response.data['results'], [2])
+
+            self.assertEqual(patched_requests.call_count, 2)
+            self.assertEqual(get_prefetcher(view.proxy_settings).stats()['hits'], 1)
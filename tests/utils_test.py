@@ -7,7 +7,7 @@ from django.http.request import QueryDict
 from django.test import TestCase
 from mock import Mock, patch
 
-from rest_framework_proxy.utils import StreamingMultipart
+from rest_framework_proxy.utils import ResponseBuffer, StreamingMultipart
 
 
 class StreamingMultipartTests(TestCase):
@@ -61,3 +61,61 @@ class StreamingMultipartTests(TestCase):
             self.fail('Unexpected iteration - %r' % v)
         except StopIteration:
             pass
+
+
+class ResponseBufferTests(TestCase):
+
+    def get_response(self, body, headers=None):
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = BytesIO(body)
+        response.headers.update(headers or {})
+        return response
+
+    def test_small_body_stays_in_memory(self):
+        body = b'{"key": "value"}'
+        response = self.get_response(body, {'Content-Length': str(len(body))})
+        buf = ResponseBuffer(response, max_memory_size=1024)
+
+        self.assertTrue(buf.in_memory)
+        self.assertEqual(buf.read(), body)
+        buf.close()
+
+    def test_large_body_is_spooled_to_disk(self):
+        body = b'x' * 4096
+        response = self.get_response(body)
+        buf = ResponseBuffer(response, max_memory_size=1024, chunk_size=1000)
+
+        self.assertFalse(buf.in_memory)
+        self.assertEqual(b''.join(buf), body)
+        buf.close()
+
+    def test_zero_threshold_always_spools(self):
+        body = b'x' * 16
+        response = self.get_response(body)
+        buf = ResponseBuffer(response, max_memory_size=0)
+
+        self.assertFalse(buf.in_memory)
+        self.assertEqual(buf.read(), body)
+        buf.close()
+
+    def test_failed_read_closes_file_and_response(self):
+        response = self.get_response(b'')
+        response.iter_content = Mock(side_effect=requests.exceptions.ChunkedEncodingError())
+        response.close = Mock()
+
+        with patch('rest_framework_proxy.utils.SpooledTemporaryFile') as spooled:
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                ResponseBuffer(response, max_memory_size=1024)
+
+        self.assertTrue(spooled.return_value.close.called)
+        self.assertTrue(response.close.called)
+
+    def test_unknown_length_under_threshold_stays_in_memory(self):
+        body = b'x' * 512
+        response = self.get_response(body, {'Content-Encoding': 'identity'})
+        buf = ResponseBuffer(response, max_memory_size=1024)
+
+        self.assertTrue(buf.in_memory)
+        self.assertEqual(buf.read(), body)
+        buf.close()
@@ -11,6 +11,7 @@ from rest_framework_proxy.views import ProxyView
 from rest_framework.test import APIRequestFactory
 from rest_framework_proxy import settings
 from rest_framework_proxy.utils import StreamingMultipart
+from requests.packages.urllib3.exceptions import ProtocolError, ReadTimeoutError
 
 
 class ProxyViewTests(TestCase):
@@ -122,3 +123,69 @@ class ProxyViewHeadersTest(TestCase):
         expected = 'Basic %s' % auth_token
 
         self.assertEqual(headers['Authorization'], expected)
+
+
+class ProxyViewResponseTest(TestCase):
+
+    def get_view(self, custom_settings=None):
+        view = ProxyView()
+        view.proxy_settings = settings.APISettings(
+            custom_settings, settings.DEFAULTS)
+        return view
+
+    def get_response(self, body, content_type='application/json'):
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = BytesIO(body)
+        response.headers['Content-Type'] = content_type
+        return response
+
+    def test_parse_spooled_response(self):
+        view = self.get_view({'RESPONSE_MAX_MEMORY_SIZE': 16})
+        view.request = None
+        view.format_kwarg = None
+        body = b'{"items": ["' + b'x' * 64 + b'"]}'
+
+        parsed = view.parse_proxy_response(self.get_response(body))
+        self.assertEqual(parsed, {'items': ['x' * 64]})
+
+    def test_raw_response_streams_spooled_body(self):
+        view = self.get_view({'RESPONSE_MAX_MEMORY_SIZE': 16, 'RETURN_RAW': True})
+        body = b'y' * 64
+
+        response = view.create_response(self.get_response(body, 'text/plain'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), body)
+        response.close()
+
+    def test_raw_response_small_body(self):
+        view = self.get_view({'RETURN_RAW': True})
+        body = b'small'
+
+        response = view.create_response(self.get_response(body, 'text/plain'))
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, body)
+
+    def proxy_failing_body(self, error):
+        view = self.get_view()
+        request = APIRequestFactory().get('some/url')
+        request.content_type = 'application/json'
+        request.query_params = ''
+        request.data = {}
+
+        response = self.get_response(b'')
+        response.raw = Mock()
+        response.raw.stream.side_effect = error
+
+        with patch('rest_framework_proxy.views.requests.request', return_value=response):
+            proxy_response = view.proxy(request)
+        self.assertTrue(response.raw.close.called or response.raw.release_conn.called)
+        return proxy_response
+
+    def test_body_read_timeout_is_bad_gateway(self):
+        proxy_response = self.proxy_failing_body(ReadTimeoutError(None, 'some/url', 'Read timed out.'))
+        self.assertEqual(proxy_response.status_code, 502)
+
+    def test_truncated_body_is_bad_gateway(self):
+        proxy_response = self.proxy_failing_body(ProtocolError('Connection reset'))
+        self.assertEqual(proxy_response.status_code, 502)